@@ -0,0 +1,20 @@
+"""
+Django settings for running the app test suite.
+
+Usage: python manage.py test --settings=app.test_settings
+"""
+
+from app.settings import *  # noqa: F401,F403
+
+# PBKDF2 is deliberately slow; tests only need a working hash, not a
+# secure one.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# Deliberately silences logging, including django.request errors from tests
+# that expect 4xx/5xx responses; failures still surface through assertions.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': True,
+}
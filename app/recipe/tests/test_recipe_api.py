@@ -1,37 +1,61 @@
-import tempfile
+import io
 import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Ingredient, Tag
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.serializers import RecipeDetailSerializer
+
+User = get_user_model()
 
 RECIPE_LIST_URL = reverse('recipe:recipe-list')
+RECIPE_DETAIL_URL = reverse(
+    'recipe:recipe-detail', args=['RECIPE_ID']
+).replace('RECIPE_ID', '{}')
+RECIPE_IMAGE_UPLOAD_URL = reverse(
+    'recipe:recipe-upload-image', args=['RECIPE_ID']
+).replace('RECIPE_ID', '{}')
+
+USER_DEFAULTS = {
+    'email': 'test@domain.com',
+    'password': 'testPass'
+}
+RECIPE_DEFAULTS = {
+    'title': 'test recipe',
+    'time_minutes': 5,
+    'price': 10.00
+}
+
+
+def create_sample_jpeg():
+    '''create and return the bytes of a small jpeg image'''
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+SAMPLE_JPEG = create_sample_jpeg()
 
 
 def compute_recipe_detail_url(recipe_id):
     '''compute and return a recipe detail url'''
-    return reverse('recipe:recipe-detail', args=[recipe_id])
+    return RECIPE_DETAIL_URL.format(recipe_id)
 
 
 def compute_recipe_image_upload_url(recipe_id):
     '''compute and return a recipe image upload url'''
-    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+    return RECIPE_IMAGE_UPLOAD_URL.format(recipe_id)
 
 
 def create_sample_user(**params):
     '''create and return a test user'''
-    defaults = {
-        'email': 'test@domain.com',
-        'password': 'testPass'
-    }
-    defaults.update(params)
-    return get_user_model().objects.create_user(**defaults)
+    return User.objects.create_user(**{**USER_DEFAULTS, **params})
 
 
 def create_sample_ingredient(user, name='Butter'):
@@ -44,23 +68,26 @@ def create_sample_tag(user, name='Main'):
     return Tag.objects.create(user=user, name=name)
 
 
+def create_sample_ingredients(user, names):
+    '''create and return sample ingredients in a single insert'''
+    return Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=name) for name in names])
+
+
+def create_sample_tags(user, names):
+    '''create and return sample tags in a single insert'''
+    return Tag.objects.bulk_create(
+        [Tag(user=user, name=name) for name in names])
+
+
 def create_sample_recipe(user, **params):
     '''create a sample recipe'''
-    defaults = {
-        'title': 'test recipe',
-        'time_minutes': 5,
-        'price': 10.00
-    }
-    defaults.update(params)
-
-    return Recipe.objects.create(user=user, **defaults)
+    return Recipe.objects.create(user=user, **{**RECIPE_DEFAULTS, **params})
 
 
 class PublicRecipeAPITest(TestCase):
     '''test suite for unauthenticated recipe api access'''
-
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
 
     def test_login_required(self):
         '''test that recipe endpoint is auth-protected'''
@@ -71,39 +98,85 @@ class PublicRecipeAPITest(TestCase):
 
 class PrivateRecipeAPITest(TestCase):
     '''test suite for authenticated recipe api access'''
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_sample_user()
 
     def setUp(self):
-        self.user = create_sample_user()
-        self.client = APIClient()
         self.client.force_authenticate(self.user)
 
     def test_get_recipe_success(self):
         '''test that auth user can get recipe list'''
-        create_sample_recipe(user=self.user)
-        create_sample_recipe(user=self.user)
+        recipe1 = create_sample_recipe(user=self.user)
+        tag = create_sample_tag(user=self.user)
+        ingredient = create_sample_ingredient(user=self.user)
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = create_sample_recipe(
+            user=self.user, title='recipe2', time_minutes=15, price=5.50)
 
         res = self.client.get(RECIPE_LIST_URL)
-        recipes = Recipe.objects.all().order_by('-id')
-        serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(dict(res.data[0]), {
+            'id': recipe2.id,
+            'title': 'recipe2',
+            'time_minutes': 15,
+            'price': '5.50',
+            'link': '',
+            'ingredients': [],
+            'tags': [],
+            'image': None,
+        })
+        self.assertEqual(dict(res.data[1]), {
+            'id': recipe1.id,
+            'title': 'test recipe',
+            'time_minutes': 5,
+            'price': '10.00',
+            'link': '',
+            'ingredients': [ingredient.id],
+            'tags': [tag.id],
+            'image': None,
+        })
 
     def test_get_recipe_auth_user(self):
         '''test that returned recipes belong to auth user'''
         user2 = create_sample_user(email='user2@domain.com')
 
-        create_sample_recipe(user=self.user)
+        recipe = create_sample_recipe(user=self.user)
         create_sample_recipe(user=user2)
 
-        res = self.client.get(RECIPE_LIST_URL)
-
-        recipes = Recipe.objects.filter(user=self.user)
-        serializer = RecipeSerializer(recipes, many=True)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_LIST_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data[0]['id'], recipe.id)
+
+    def test_list_recipes_query_count(self):
+        '''test recipe listing does not query tags/ingredients per recipe'''
+        expected = {}
+        for title in ('recipe1', 'recipe2', 'recipe3'):
+            recipe = create_sample_recipe(user=self.user, title=title)
+            tag = create_sample_tag(user=self.user, name=f'{title} tag')
+            ingredient = create_sample_ingredient(
+                user=self.user, name=f'{title} ingredient')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            expected[recipe.id] = ([tag.id], [ingredient.id])
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 3)
+        for item in res.data:
+            tag_ids, ingredient_ids = expected[item['id']]
+            self.assertEqual(item['tags'], tag_ids)
+            self.assertEqual(item['ingredients'], ingredient_ids)
 
     def test_view_recipe_detail(self):
         '''test viewing recipe detail api endpoint'''
@@ -135,8 +208,7 @@ class PrivateRecipeAPITest(TestCase):
 
     def test_create_recipe_with_tags(self):
         '''test create recipe with tags'''
-        tag1 = create_sample_tag(user=self.user, name='Beef')
-        tag2 = create_sample_tag(user=self.user, name='Vegan')
+        tag1, tag2 = create_sample_tags(self.user, ['Beef', 'Vegan'])
 
         payload = {
             'title': 'test recipe tags',
@@ -156,8 +228,8 @@ class PrivateRecipeAPITest(TestCase):
 
     def test_create_recipe_with_ingredient(self):
         '''test create recipe with ingredients'''
-        ingredient1 = create_sample_ingredient(user=self.user, name='Broccoli')
-        ingredient2 = create_sample_ingredient(user=self.user, name='Cabbage')
+        ingredient1, ingredient2 = create_sample_ingredients(
+            self.user, ['Broccoli', 'Cabbage'])
 
         default = {
             'title': 'test recipe ingredient',
@@ -178,11 +250,11 @@ class PrivateRecipeAPITest(TestCase):
     def test_update_recipe_patch(self):
         '''test updating recipe through http patch'''
         recipe = create_sample_recipe(user=self.user)
-        recipe.tags.add(create_sample_tag(user=self.user))
-        recipe.tags.add(create_sample_tag(user=self.user, name='Moves'))
+        tag1, tag2, new_tag = create_sample_tags(
+            self.user, ['Main', 'Moves', 'Goat Meat'])
+        recipe.tags.add(tag1, tag2)
         recipe.ingredients.add(create_sample_ingredient(user=self.user))
 
-        new_tag = create_sample_tag(user=self.user, name='Goat Meat')
         payload = {
             'title': 'Egusi Soup',
             'tags': [new_tag.id]
@@ -190,11 +262,10 @@ class PrivateRecipeAPITest(TestCase):
 
         self.client.patch(compute_recipe_detail_url(recipe.id), payload)
 
-        recipe.refresh_from_db()
-        self.assertEqual(recipe.title, payload['title'])
-        tags = recipe.tags.all()
-        self.assertEqual(len(tags), 1)
-        self.assertIn(new_tag, tags)
+        row = Recipe.objects.values('title').get(pk=recipe.id)
+        self.assertEqual(row['title'], payload['title'])
+        tag_ids = recipe.tags.values_list('id', flat=True)
+        self.assertEqual(list(tag_ids), [new_tag.id])
 
     def test_update_recipe_put(self):
         '''test updating recipe through http put'''
@@ -210,74 +281,67 @@ class PrivateRecipeAPITest(TestCase):
 
         self.client.put(compute_recipe_detail_url(recipe.id), payload)
 
-        recipe.refresh_from_db()
-        tags = recipe.tags.all()
-        ingredients = recipe.ingredients.all()
-        self.assertEqual(recipe.title, payload['title'])
-        self.assertEqual(recipe.time_minutes, payload['time_minutes'])
-        self.assertEqual(recipe.price, payload['price'])
-        self.assertEqual(len(tags), 0)
-        self.assertEqual(len(ingredients), 0)
+        row = Recipe.objects.values(
+            'title', 'time_minutes', 'price').get(pk=recipe.id)
+        self.assertEqual(row['title'], payload['title'])
+        self.assertEqual(row['time_minutes'], payload['time_minutes'])
+        self.assertEqual(row['price'], payload['price'])
+        self.assertEqual(recipe.tags.count(), 0)
+        self.assertEqual(recipe.ingredients.count(), 0)
 
     def test_filter_recipe_by_tags(self):
         '''test the functionality of filtering recipe by tag'''
         recipe1 = create_sample_recipe(user=self.user, title='recipe1')
         recipe2 = create_sample_recipe(user=self.user, title='recipe2')
         recipe3 = create_sample_recipe(user=self.user, title='recipe3')
-        tag1 = create_sample_tag(user=self.user, name='tag1')
-        tag2 = create_sample_tag(user=self.user, name='tag2')
+        tag1, tag2 = create_sample_tags(self.user, ['tag1', 'tag2'])
 
         recipe1.tags.add(tag1)
         recipe2.tags.add(tag2)
 
-        res = self.client.get(
-            RECIPE_LIST_URL, {'tags': f'{tag1.id},{tag2.id}'})
-
-        serializer1 = RecipeSerializer(recipe1)
-        serializer2 = RecipeSerializer(recipe2)
-        serializer3 = RecipeSerializer(recipe3)
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPE_LIST_URL, {'tags': f'{tag1.id},{tag2.id}'})
+        returned_ids = {r['id'] for r in res.data}
 
         self.assertEqual(len(res.data), 2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertEqual(returned_ids, {recipe1.id, recipe2.id})
+        self.assertNotIn(recipe3.id, returned_ids)
 
     def test_filter_recipe_by_ingredients(self):
         '''test the functionality of filtering recipe by ingredient'''
         recipe1 = create_sample_recipe(user=self.user, title='recipe1')
         recipe2 = create_sample_recipe(user=self.user, title='recipe2')
         recipe3 = create_sample_recipe(user=self.user, title='recipe3')
-        ingredient1 = create_sample_ingredient(
-            user=self.user, name='ingredient1')
-        ingredient2 = create_sample_ingredient(
-            user=self.user, name='ingredient2')
+        ingredient1, ingredient2 = create_sample_ingredients(
+            self.user, ['ingredient1', 'ingredient2'])
 
         recipe1.ingredients.add(ingredient1)
         recipe2.ingredients.add(ingredient2)
 
-        res = self.client.get(
-            RECIPE_LIST_URL,
-            {'ingredients': f'{ingredient1.id},{ingredient2.id}'}
-        )
-
-        serializer1 = RecipeSerializer(recipe1)
-        serializer2 = RecipeSerializer(recipe2)
-        serializer3 = RecipeSerializer(recipe3)
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPE_LIST_URL,
+                {'ingredients': f'{ingredient1.id},{ingredient2.id}'}
+            )
+        returned_ids = {r['id'] for r in res.data}
 
         self.assertEqual(len(res.data), 2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertEqual(returned_ids, {recipe1.id, recipe2.id})
+        self.assertNotIn(recipe3.id, returned_ids)
 
 
 class RecipeImageUploadAPITest(TestCase):
     '''test suite for recipe image upload'''
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_sample_user()
+        cls.recipe = create_sample_recipe(user=cls.user)
 
     def setUp(self):
-        self.user = create_sample_user()
-        self.client = APIClient()
         self.client.force_authenticate(self.user)
-        self.recipe = create_sample_recipe(user=self.user)
 
     def tearDown(self):
         self.recipe.image.delete()
@@ -286,12 +350,9 @@ class RecipeImageUploadAPITest(TestCase):
         '''test recipe image are uploaded successfully'''
         url = compute_recipe_image_upload_url(self.recipe.id)
 
-        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
-            img = Image.new('RGB', (10, 10))
-            img.save(ntf, format='JPEG')
-            ntf.seek(0)
+        image = SimpleUploadedFile('test.jpg', SAMPLE_JPEG, 'image/jpeg')
 
-            res = self.client.post(url, {'image': ntf}, format='multipart')
+        res = self.client.post(url, {'image': image})
 
         self.recipe.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -301,6 +362,6 @@ class RecipeImageUploadAPITest(TestCase):
     def test_upload_image_bad_request(self):
         '''test uploading invalid image file'''
         url = compute_recipe_image_upload_url(self.recipe.id)
-        res = self.client.post(url, {'image': 'not-img'}, format='multipart')
+        res = self.client.post(url, {'image': 'not-img'})
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
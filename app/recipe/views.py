@@ -68,6 +68,9 @@ class RecipeViewSet(ModelViewSet):
             ingredients_ids = self.params_to_ids(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredients_ids)
 
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+
         return queryset.filter(user=self.request.user).order_by('-id')
 
     def perform_create(self, serializer):
@@ -4,11 +4,16 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
 
+INVALID_CREDENTIALS_MSG = _('Unable to log in with provided credentials.')
+MISSING_CREDENTIALS_MSG = _('Must include "email" and "password".')
+
+User = get_user_model()
+
 
 class UserSerializer(serializers.ModelSerializer):
     '''serializes the user model'''
     class Meta:
-        model = get_user_model()
+        model = User
         fields = ('id', 'email', 'name', 'password')
         extra_kwargs = {
             'password': {
@@ -20,7 +25,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         '''create and return a new user with encrypted password'''
-        return get_user_model().objects.create_user(**validated_data)
+        return User.objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
         '''update user data and return it'''
@@ -45,8 +50,7 @@ class UserLoginSerializer(serializers.Serializer):
     )
 
     def validate(self, attrs):
-        email = attrs.get('email')
-        password = attrs.get('password')
+        email, password = attrs.get('email'), attrs.get('password')
 
         if email and password:
             user = authenticate(request=self.context.get('request'),
@@ -56,11 +60,11 @@ class UserLoginSerializer(serializers.Serializer):
             # users. (Assuming the default ModelBackend authentication
             # backend.)
             if not user:
-                msg = _('Unable to log in with provided credentials.')
-                raise serializers.ValidationError(msg, code='authorization')
+                raise serializers.ValidationError(
+                    INVALID_CREDENTIALS_MSG, code='authorization')
         else:
-            msg = _('Must include "email" and "password".')
-            raise serializers.ValidationError(msg, code='authorization')
+            raise serializers.ValidationError(
+                MISSING_CREDENTIALS_MSG, code='authorization')
 
         attrs['user'] = user
         return attrs